@@ -56,7 +56,9 @@
 # later. See the COPYING file in the top-level directory.
 
 import argparse
+import functools
 from importlib.util import find_spec
+import json
 import logging
 import os
 from pathlib import Path
@@ -69,7 +71,8 @@
 from types import SimpleNamespace
 from typing import (
     Any,
-    Iterator,
+    Dict,
+    List,
     Optional,
     Sequence,
     Tuple,
@@ -147,15 +150,15 @@ def __init__(self, *args: Any, **kwargs: Any) -> None:
             kwargs["system_site_packages"] = sys.base_prefix in site.PREFIXES
 
         # ensurepip is slow: venv creation can be very fast for cases where
-        # we allow the use of system_site_packages. Therefore, ensurepip is
-        # replaced with our own script generation once the virtual environment
-        # is setup.
+        # we allow the use of system_site_packages or of the parent venv's
+        # packages. Therefore, ensurepip is replaced with our own script
+        # generation once the virtual environment is setup.
         self.want_pip = kwargs.get("with_pip", False)
         if self.want_pip:
             if (
                 kwargs.get("system_site_packages", False)
-                and not need_ensurepip()
-            ):
+                or self.use_parent_packages
+            ) and not need_ensurepip():
                 kwargs["with_pip"] = False
             else:
                 check_ensurepip(suggest_remedy=True)
@@ -301,6 +304,23 @@ def check_ensurepip(prefix: str = "", suggest_remedy: bool = False) -> None:
         raise Ouch(prefix + msg)
 
 
+def _load_stamp(env_dir: Union[str, Path]) -> Dict[str, Any]:
+    """Load the stamp that mkvenv keeps in the venv at @env_dir."""
+    try:
+        stamp = json.loads(Path(env_dir, ".mkvenv-stamp").read_text("UTF-8"))
+    except (OSError, ValueError):
+        return {}
+    return stamp if isinstance(stamp, dict) else {}
+
+
+def _save_stamp(env_dir: Union[str, Path], stamp: Dict[str, Any]) -> None:
+    try:
+        path = Path(env_dir, ".mkvenv-stamp")
+        path.write_text(json.dumps(stamp), encoding="UTF-8")
+    except OSError as exc:
+        logger.debug("could not write stamp: %s", str(exc))
+
+
 def make_venv(  # pylint: disable=too-many-arguments
     env_dir: Union[str, Path],
     system_site_packages: bool = False,
@@ -318,7 +338,9 @@ def make_venv(  # pylint: disable=too-many-arguments
     :param env_dir: The directory to create/install to.
     :param system_site_packages:
         Allow inheriting packages from the system installation.
-    :param clear: When True, fully remove any prior venv and files.
+    :param clear:
+        When True, fully remove any prior venv and files, unless mkvenv
+        already created one there with the same interpreter and options.
     :param symlinks:
         Whether to use symlinks to the target interpreter or not. If
         left unspecified, it will use symlinks except on Windows to
@@ -341,6 +363,24 @@ def make_venv(  # pylint: disable=too-many-arguments
         # Default behavior of standard venv CLI
         symlinks = os.name != "nt"
 
+    # Re-running ensurepip is slow; if the venv was already created by
+    # this interpreter with the same options, just reuse it.
+    options: List[Any] = [sys.executable, sys.version]
+    options += [system_site_packages, symlinks, with_pip]
+    stamp = _load_stamp(env_dir)
+    env_exe = stamp.get("env_exe")
+    if (
+        stamp.get("options") == options
+        and isinstance(env_exe, str)
+        and os.access(env_exe, os.X_OK)
+    ):
+        print(
+            f"mkvenv: Reusing virtual environment at '{str(env_dir)}'",
+            file=sys.stderr,
+        )
+        print(env_exe)
+        return
+
     builder = QemuEnvBuilder(
         system_site_packages=system_site_packages,
         clear=clear,
@@ -393,63 +433,70 @@ def _stringify(data: Union[str, bytes]) -> str:
 
         raise Ouch("VENV creation subprocess failed.") from exc
 
+    env_exe = builder.get_value("env_exe")
+    _save_stamp(env_dir, {"options": options, "env_exe": env_exe})
+
     # print the python executable to stdout for configure.
-    print(builder.get_value("env_exe"))
+    print(env_exe)
 
 
-def _gen_importlib(packages: Sequence[str]) -> Iterator[str]:
+@functools.lru_cache(maxsize=None)
+def _get_dist(package: str) -> Optional[Tuple[str, str, Tuple[str, ...]]]:
+    """
+    Return the version, location and console_scripts entry points of
+    @package, or None if it is not installed.
+
+    Call `_get_dist.cache_clear()` after installing packages.
+    """
     # pylint: disable=import-outside-toplevel
     # pylint: disable=no-name-in-module
     # pylint: disable=import-error
     try:
-        # First preference: Python 3.8+ stdlib
-        from importlib.metadata import (  # type: ignore
-            PackageNotFoundError,
-            distribution,
-        )
+        try:
+            # First preference: Python 3.8+ stdlib
+            from importlib.metadata import (  # type: ignore
+                PackageNotFoundError,
+                distribution,
+            )
+        except ImportError as exc:
+            logger.debug("%s", str(exc))
+            # Second preference: Commonly available PyPI backport
+            from importlib_metadata import (  # type: ignore
+                PackageNotFoundError,
+                distribution,
+            )
     except ImportError as exc:
         logger.debug("%s", str(exc))
-        # Second preference: Commonly available PyPI backport
-        from importlib_metadata import (  # type: ignore
-            PackageNotFoundError,
-            distribution,
+    else:
+        try:
+            dist = distribution(package)
+        except PackageNotFoundError:
+            return None
+        # The EntryPoints type is only available in 3.10+,
+        # treat this as a vanilla list and filter it ourselves.
+        entry_points = tuple(
+            f"{entry_point.name} = {entry_point.value}"
+            for entry_point in dist.entry_points
+            if entry_point.group == "console_scripts"
         )
+        return str(dist.version), str(dist.locate_file(".")), entry_points
 
-    def _generator() -> Iterator[str]:
-        for package in packages:
-            try:
-                entry_points = distribution(package).entry_points
-            except PackageNotFoundError:
-                continue
-
-            # The EntryPoints type is only available in 3.10+,
-            # treat this as a vanilla list and filter it ourselves.
-            entry_points = filter(
-                lambda ep: ep.group == "console_scripts", entry_points
-            )
-
-            for entry_point in entry_points:
-                yield f"{entry_point.name} = {entry_point.value}"
-
-    return _generator()
-
-
-def _gen_pkg_resources(packages: Sequence[str]) -> Iterator[str]:
-    # pylint: disable=import-outside-toplevel
-    # Bundled with setuptools; has a good chance of being available.
-    import pkg_resources
-
-    def _generator() -> Iterator[str]:
-        for package in packages:
-            try:
-                eps = pkg_resources.get_entry_map(package, "console_scripts")
-            except pkg_resources.DistributionNotFound:
-                continue
-
-            for entry_point in eps.values():
-                yield str(entry_point)
+    try:
+        # Python 3.7 with setuptools installed.
+        import pkg_resources
+    except ImportError as exc:
+        logger.debug("%s", str(exc))
+        raise Ouch(
+            "Neither importlib.metadata nor pkg_resources found. "
+            "Use Python 3.8+, or install importlib-metadata or setuptools."
+        ) from exc
 
-    return _generator()
+    try:
+        dist = pkg_resources.get_distribution(package)
+    except pkg_resources.DistributionNotFound:
+        return None
+    eps = dist.get_entry_map("console_scripts").values()
+    return str(dist.version), str(dist.location), tuple(map(str, eps))
 
 
 def generate_console_scripts(
@@ -476,32 +523,15 @@ def generate_console_scripts(
     if not packages:
         return
 
-    def _get_entry_points() -> Iterator[str]:
-        """Python 3.7 compatibility shim for iterating entry points."""
-        # Python 3.8+, or Python 3.7 with importlib_metadata installed.
-        try:
-            return _gen_importlib(packages)
-        except ImportError as exc:
-            logger.debug("%s", str(exc))
-
-        # Python 3.7 with setuptools installed.
-        try:
-            return _gen_pkg_resources(packages)
-        except ImportError as exc:
-            logger.debug("%s", str(exc))
-            raise Ouch(
-                "Neither importlib.metadata nor pkg_resources found, "
-                "can't generate console script shims.\n"
-                "Use Python 3.8+, or install importlib-metadata or setuptools."
-            ) from exc
-
     maker = distlib.scripts.ScriptMaker(None, bin_path)
     maker.variants = {""}
     maker.clobber = False
 
-    for entry_point in _get_entry_points():
-        for filename in maker.make(entry_point):
-            logger.debug("wrote console_script '%s'", filename)
+    for package in packages:
+        dist = _get_dist(package)
+        for entry_point in dist[2] if dist else ():
+            for filename in maker.make(entry_point):
+                logger.debug("wrote console_script '%s'", filename)
 
 
 def checkpip() -> bool:
@@ -553,55 +583,9 @@ def pkgname_from_depspec(dep_spec: str) -> str:
     return match.group(0)
 
 
-def _get_path_importlib(package: str) -> Optional[str]:
-    # pylint: disable=import-outside-toplevel
-    # pylint: disable=no-name-in-module
-    # pylint: disable=import-error
-    try:
-        # First preference: Python 3.8+ stdlib
-        from importlib.metadata import (  # type: ignore
-            PackageNotFoundError,
-            distribution,
-        )
-    except ImportError as exc:
-        logger.debug("%s", str(exc))
-        # Second preference: Commonly available PyPI backport
-        from importlib_metadata import (  # type: ignore
-            PackageNotFoundError,
-            distribution,
-        )
-
-    try:
-        return str(distribution(package).locate_file("."))
-    except PackageNotFoundError:
-        return None
-
-
-def _get_path_pkg_resources(package: str) -> Optional[str]:
-    # pylint: disable=import-outside-toplevel
-    # Bundled with setuptools; has a good chance of being available.
-    import pkg_resources
-
-    try:
-        return str(pkg_resources.get_distribution(package).location)
-    except pkg_resources.DistributionNotFound:
-        return None
-
-
 def _get_path(package: str) -> Optional[str]:
-    try:
-        return _get_path_importlib(package)
-    except ImportError as exc:
-        logger.debug("%s", str(exc))
-
-    try:
-        return _get_path_pkg_resources(package)
-    except ImportError as exc:
-        logger.debug("%s", str(exc))
-        raise Ouch(
-            "Neither importlib.metadata nor pkg_resources found. "
-            "Use Python 3.8+, or install importlib-metadata or setuptools."
-        ) from exc
+    dist = _get_dist(package)
+    return dist[1] if dist else None
 
 
 def _path_is_prefix(prefix: Optional[str], path: str) -> bool:
@@ -621,55 +605,9 @@ def _is_system_package(package: str) -> bool:
     )
 
 
-def _get_version_importlib(package: str) -> Optional[str]:
-    # pylint: disable=import-outside-toplevel
-    # pylint: disable=no-name-in-module
-    # pylint: disable=import-error
-    try:
-        # First preference: Python 3.8+ stdlib
-        from importlib.metadata import (  # type: ignore
-            PackageNotFoundError,
-            distribution,
-        )
-    except ImportError as exc:
-        logger.debug("%s", str(exc))
-        # Second preference: Commonly available PyPI backport
-        from importlib_metadata import (  # type: ignore
-            PackageNotFoundError,
-            distribution,
-        )
-
-    try:
-        return str(distribution(package).version)
-    except PackageNotFoundError:
-        return None
-
-
-def _get_version_pkg_resources(package: str) -> Optional[str]:
-    # pylint: disable=import-outside-toplevel
-    # Bundled with setuptools; has a good chance of being available.
-    import pkg_resources
-
-    try:
-        return str(pkg_resources.get_distribution(package).version)
-    except pkg_resources.DistributionNotFound:
-        return None
-
-
 def _get_version(package: str) -> Optional[str]:
-    try:
-        return _get_version_importlib(package)
-    except ImportError as exc:
-        logger.debug("%s", str(exc))
-
-    try:
-        return _get_version_pkg_resources(package)
-    except ImportError as exc:
-        logger.debug("%s", str(exc))
-        raise Ouch(
-            "Neither importlib.metadata nor pkg_resources found. "
-            "Use Python 3.8+, or install importlib-metadata or setuptools."
-        ) from exc
+    dist = _get_dist(package)
+    return dist[0] if dist else None
 
 
 def diagnose(
@@ -780,10 +718,40 @@ def pip_install(
     if wheels_dir:
         full_args += ["--find-links", f"file://{str(wheels_dir)}"]
     full_args += list(args)
-    subprocess.run(
-        full_args,
-        check=True,
-    )
+    try:
+        subprocess.run(
+            full_args,
+            check=True,
+        )
+    finally:
+        # Installed distributions may have changed.
+        _get_dist.cache_clear()
+
+
+def _load_resolve_cache() -> Dict[str, str]:
+    """Load the versions that pip previously installed for each dep_spec."""
+    cache = _load_stamp(sys.prefix).get("specs") if inside_a_venv() else None
+    if not isinstance(cache, dict):
+        return {}
+    specs: Dict[str, str] = {}
+    for spec, ver in cache.items():
+        if not isinstance(spec, str) or not isinstance(ver, str):
+            return {}
+        specs[spec] = ver
+    return specs
+
+
+def _save_resolve_cache(dep_specs: Sequence[str]) -> None:
+    """Record the versions that pip has just installed for @dep_specs."""
+    if not inside_a_venv():
+        return
+    stamp = _load_stamp(sys.prefix)
+    stamp["specs"] = _load_resolve_cache()
+    for spec in dep_specs:
+        ver = _get_version(pkgname_from_depspec(spec))
+        if ver is not None:
+            stamp["specs"][spec] = ver
+    _save_stamp(sys.prefix, stamp)
 
 
 def _do_ensure(
@@ -806,15 +774,21 @@ def _do_ensure(
     """
     absent = []
     present = []
+    resolved = _load_resolve_cache()
     for spec in dep_specs:
         matcher = distlib.version.LegacyMatcher(spec)
         ver = _get_version(matcher.name)
         if (
             ver is None
-            # Always pass installed package to pip, so that they can be
-            # updated if the requested version changes
-            or not _is_system_package(matcher.name)
             or not matcher.match(distlib.version.LegacyVersion(ver))
+            # Always pass installed package to pip, so that they can be
+            # updated if the requested version changes, unless pip has
+            # already settled on this version for this very dep_spec.
+            # Packages from the parent venv or the system site-packages
+            # are never passed to pip.
+            or not (
+                _is_system_package(matcher.name) or resolved.get(spec) == ver
+            )
         ):
             absent.append(spec)
         else:
@@ -831,6 +805,7 @@ def _do_ensure(
             print(f"mkvenv: installing {', '.join(absent)}", file=sys.stderr)
             try:
                 pip_install(args=absent, online=online, wheels_dir=wheels_dir)
+                _save_resolve_cache(absent)
                 return None
             except subprocess.CalledProcessError:
                 pass
@@ -842,6 +817,7 @@ def _do_ensure(
             prog if absent[0] == dep_specs[0] else None,
         )
 
+    logger.debug("all of %s satisfied, not running pip", dep_specs)
     return None
 
 
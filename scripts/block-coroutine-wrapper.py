@@ -23,15 +23,16 @@
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import functools
 import sys
 import re
 from typing import Iterator
 
 
-def gen_header():
+def _make_header() -> str:
     copyright = re.sub('^.*Copyright', 'Copyright', __doc__, flags=re.DOTALL)
-    copyright = re.sub('^(?=.)', ' * ', copyright.strip(), flags=re.MULTILINE)
-    copyright = re.sub('^$', ' *', copyright, flags=re.MULTILINE)
+    copyright = re.sub('^(.*)$', lambda m: f' * {m[1]}' if m[1] else ' *',
+                       copyright.strip(), flags=re.MULTILINE)
     return f"""\
 /*
  * File is generated by scripts/block-coroutine-wrapper.py
@@ -47,19 +48,29 @@ def gen_header():
 """
 
 
+# __doc__ never changes, so build the header only once
+_HEADER = _make_header()
+
+
+def gen_header() -> str:
+    return _HEADER
+
+
+# Match a whole parameter declaration, e.g. 'BlockDriverState *bs'
+param_decl_re = re.compile(r'(?P<type>.*[ *])'
+                           r'(?P<name>[a-z][a-z0-9_]*)', re.ASCII)
+
+
 class ParamDecl:
-    param_re = re.compile(r'(?P<decl>'
-                          r'(?P<type>.*[ *])'
-                          r'(?P<name>[a-z][a-z0-9_]*)'
-                          r')')
+    __slots__ = ('decl', 'type', 'name')
 
     def __init__(self, param_decl: str) -> None:
-        m = self.param_re.match(param_decl.strip())
+        decl = param_decl.strip()
+        m = param_decl_re.fullmatch(decl)
         if m is None:
             raise ValueError(f'Wrong parameter declaration: "{param_decl}"')
-        self.decl = m.group('decl')
-        self.type = m.group('type')
-        self.name = m.group('name')
+        self.decl = decl
+        self.type, self.name = m.group('type', 'name')
 
 
 class FuncDecl:
@@ -68,7 +79,7 @@ def __init__(self, wrapper_type: str, return_type: str, name: str,
         self.return_type = return_type.strip()
         self.name = name.strip()
         self.struct_name = snake_to_camel(self.name)
-        self.args = [ParamDecl(arg.strip()) for arg in args.split(',')]
+        self.args = [ParamDecl(arg) for arg in args.split(',')]
         self.create_only_co = 'mixed' not in variant
         self.graph_rdlock = 'bdrv_rdlock' in variant
 
@@ -90,6 +101,12 @@ def __init__(self, wrapper_type: str, return_type: str, name: str,
 
         self.ctx = self.gen_ctx()
 
+        # Argument lists and blocks used several times by the generators
+        self.decl_list = ', '.join(arg.decl for arg in self.args)
+        self.name_list = ', '.join(arg.name for arg in self.args)
+        self.s_name_list = ', '.join('s->' + arg.name for arg in self.args)
+        self.decl_block = '\n'.join(f'    {arg.decl};' for arg in self.args)
+
         self.get_result = 's->ret = '
         self.ret = 'return s.ret;'
         self.co_ret = 'return '
@@ -111,11 +128,10 @@ def gen_ctx(self, prefix: str = '') -> str:
         else:
             return 'qemu_get_aio_context()'
 
-    def gen_list(self, format: str) -> str:
-        return ', '.join(format.format_map(arg.__dict__) for arg in self.args)
-
     def gen_block(self, format: str) -> str:
-        return '\n'.join(format.format_map(arg.__dict__) for arg in self.args)
+        return '\n'.join(format.format(decl=arg.decl, type=arg.type,
+                                       name=arg.name)
+                         for arg in self.args)
 
 
 # Match wrappers declared with a co_wrapper mark
@@ -124,7 +140,7 @@ def gen_block(self, format: str) -> str:
                           r'\s*(?P<wrapper_type>(no_)?co)_wrapper'
                           r'(?P<variant>(_[a-z][a-z0-9_]*)?)\s*'
                           r'(?P<wrapper_name>[a-z][a-z0-9_]*)'
-                          r'\((?P<args>[^)]*)\);$', re.MULTILINE)
+                          r'\((?P<args>[^)]*)\);$', re.MULTILINE | re.ASCII)
 
 
 def func_decl_iter(text: str) -> Iterator:
@@ -136,14 +152,13 @@ def func_decl_iter(text: str) -> Iterator:
                        variant=m.group('variant'))
 
 
+@functools.lru_cache(maxsize=None)
 def snake_to_camel(func_name: str) -> str:
     """
     Convert underscore names like 'some_function_name' to camel-case like
     'SomeFunctionName'
     """
-    words = func_name.split('_')
-    words = [w[0].upper() + w[1:] for w in words]
-    return ''.join(words)
+    return ''.join(w[:1].upper() + w[1:] for w in func_name.split('_'))
 
 
 def create_mixed_wrapper(func: FuncDecl) -> str:
@@ -155,11 +170,11 @@ def create_mixed_wrapper(func: FuncDecl) -> str:
     graph_assume_lock = 'assume_graph_lock();' if func.graph_rdlock else ''
 
     return f"""\
-{func.return_type} {func.name}({ func.gen_list('{decl}') })
+{func.return_type} {func.name}({func.decl_list})
 {{
     if (qemu_in_coroutine()) {{
         {graph_assume_lock}
-        {func.co_ret}{name}({ func.gen_list('{name}') });
+        {func.co_ret}{name}({func.name_list});
     }} else {{
         {struct_name} s = {{
             .poll_state.ctx = {func.ctx},
@@ -183,7 +198,7 @@ def create_co_wrapper(func: FuncDecl) -> str:
     name = func.target_name
     struct_name = func.struct_name
     return f"""\
-{func.return_type} {func.name}({ func.gen_list('{decl}') })
+{func.return_type} {func.name}({func.decl_list})
 {{
     {struct_name} s = {{
         .poll_state.ctx = {func.ctx},
@@ -225,7 +240,7 @@ def gen_co_wrapper(func: FuncDecl) -> str:
 typedef struct {struct_name} {{
     BdrvPollCo poll_state;
     {func.return_field}
-{ func.gen_block('    {decl};') }
+{func.decl_block}
 }} {struct_name};
 
 static void coroutine_fn {name}_entry(void *opaque)
@@ -233,7 +248,7 @@ def gen_co_wrapper(func: FuncDecl) -> str:
     {struct_name} *s = opaque;
 
 {graph_lock}
-    {func.get_result}{name}({ func.gen_list('s->{name}') });
+    {func.get_result}{name}({func.s_name_list});
 {graph_unlock}
     s->poll_state.in_progress = false;
 
@@ -258,7 +273,7 @@ def gen_no_co_wrapper(func: FuncDecl) -> str:
 typedef struct {struct_name} {{
     Coroutine *co;
     {func.return_field}
-{ func.gen_block('    {decl};') }
+{func.decl_block}
 }} {struct_name};
 
 static void {name}_bh(void *opaque)
@@ -267,13 +282,13 @@ def gen_no_co_wrapper(func: FuncDecl) -> str:
     AioContext *ctx = {func.gen_ctx('s->')};
 
     aio_context_acquire(ctx);
-    {func.get_result}{name}({ func.gen_list('s->{name}') });
+    {func.get_result}{name}({func.s_name_list});
     aio_context_release(ctx);
 
     aio_co_wake(s->co);
 }}
 
-{func.return_type} coroutine_fn {func.name}({ func.gen_list('{decl}') })
+{func.return_type} coroutine_fn {func.name}({func.decl_list})
 {{
     {struct_name} s = {{
         .co = qemu_coroutine_self(),
@@ -289,15 +304,15 @@ def gen_no_co_wrapper(func: FuncDecl) -> str:
 
 
 def gen_wrappers(input_code: str) -> str:
-    res = ''
+    res = []
     for func in func_decl_iter(input_code):
-        res += '\n\n\n'
+        res.append('\n\n\n')
         if func.wrapper_type == 'co':
-            res += gen_co_wrapper(func)
+            res.append(gen_co_wrapper(func))
         else:
-            res += gen_no_co_wrapper(func)
+            res.append(gen_no_co_wrapper(func))
 
-    return res
+    return ''.join(res)
 
 
 if __name__ == '__main__':
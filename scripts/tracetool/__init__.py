@@ -53,10 +53,13 @@ def out(*lines, **kwargs):
     global out_lineno
     output = []
     for l in lines:
-        kwargs['out_lineno'] = out_lineno
-        kwargs['out_next_lineno'] = out_lineno + 1
-        kwargs['out_filename'] = out_filename
-        output.append(l % kwargs)
+        # Lines without conversion specifiers are already formatted
+        if '%' in l:
+            kwargs['out_lineno'] = out_lineno
+            kwargs['out_next_lineno'] = out_lineno + 1
+            kwargs['out_filename'] = out_filename
+            l = l % kwargs
+        output.append(l)
         out_lineno += 1
 
     out_fobj.writelines("\n".join(output) + "\n")
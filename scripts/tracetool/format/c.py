@@ -28,28 +28,26 @@ def generate(events, backend, group):
         '#include "%s"' % header,
         '')
 
-    for e in events:
-        out('uint16_t %s;' % e.api(e.QEMU_DSTATE))
+    dstate_defs = ['uint16_t %s;' % e.api(e.QEMU_DSTATE) for e in events]
+    if dstate_defs:
+        out(*dstate_defs)
 
+    event_defs = []
     for e in events:
-        out('TraceEvent %(event)s = {',
+        event_defs += [
+            'TraceEvent %s = {' % e.api(e.QEMU_EVENT),
             '    .id = 0,',
-            '    .name = \"%(name)s\",',
-            '    .sstate = %(sstate)s,',
-            '    .dstate = &%(dstate)s ',
+            '    .name = \"%s\",' % e.name,
+            '    .sstate = TRACE_%s_ENABLED,' % e.name.upper(),
+            '    .dstate = &%s ' % e.api(e.QEMU_DSTATE),
             '};',
-            event = e.api(e.QEMU_EVENT),
-            name = e.name,
-            sstate = "TRACE_%s_ENABLED" % e.name.upper(),
-            dstate = e.api(e.QEMU_DSTATE))
-
-    out('TraceEvent *%(group)s_trace_events[] = {',
-        group = group.lower())
-
-    for e in events:
-        out('    &%(event)s,', event = e.api(e.QEMU_EVENT))
+        ]
+    if event_defs:
+        out(*event_defs)
 
-    out('  NULL,',
+    out('TraceEvent *%s_trace_events[] = {' % group.lower(),
+        *['    &%s,' % e.api(e.QEMU_EVENT) for e in events],
+        '  NULL,',
         '};',
         '')
 
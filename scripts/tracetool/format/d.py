@@ -18,7 +18,7 @@
 
 # Reserved keywords from
 # https://wikis.oracle.com/display/DTrace/Types,+Operators+and+Expressions
-RESERVED_WORDS = (
+RESERVED_WORDS = frozenset((
     'auto', 'goto', 'sizeof', 'break', 'if', 'static', 'case', 'import',
     'string', 'char', 'inline', 'stringof', 'const', 'int', 'struct',
     'continue', 'long', 'switch', 'counter', 'offsetof', 'this',
@@ -26,7 +26,21 @@
     'double', 'register', 'union', 'else', 'restrict', 'unsigned',
     'enum', 'return', 'void', 'extern', 'self', 'volatile', 'float',
     'short', 'while', 'for', 'signed', 'xlate',
-)
+))
+
+
+# macOS dtrace accepts only C99 _Bool.
+# It also converts int8_t * in probe points to char * in header files and
+# introduces [-Wpointer-sign] warning.  Avoid it by changing probe type to
+# signed char * beforehand.
+if platform == "darwin":
+    TYPE_FIXUPS = {
+        'bool': '_Bool',
+        'bool *': '_Bool *',
+        'int8_t *': 'signed char *',
+    }
+else:
+    TYPE_FIXUPS = {}
 
 
 def generate(events, backend, group):
@@ -43,20 +57,11 @@ def generate(events, backend, group):
         '',
         'provider qemu {')
 
+    probes = []
     for e in events:
         args = []
         for type_, name in e.args:
-            if platform == "darwin":
-                # macOS dtrace accepts only C99 _Bool
-                if type_ == 'bool':
-                    type_ = '_Bool'
-                if type_ == 'bool *':
-                    type_ = '_Bool *'
-                # It converts int8_t * in probe points to char * in header
-                # files and introduces [-Wpointer-sign] warning.
-                # Avoid it by changing probe type to signed char * beforehand.
-                if type_ == 'int8_t *':
-                    type_ = 'signed char *'
+            type_ = TYPE_FIXUPS.get(type_, type_)
 
             # SystemTap dtrace(1) emits a warning when long long is used
             type_ = type_.replace('unsigned long long', 'uint64_t')
@@ -68,10 +73,9 @@ def generate(events, backend, group):
             args.append(type_ + ' ' + name)
 
         # Define prototype for probe arguments
-        out('',
-            'probe %(name)s(%(args)s);',
-            name=e.name,
-            args=','.join(args))
+        probes.append('')
+        probes.append('probe %s(%s);' % (e.name, ','.join(args)))
 
-    out('',
+    out(*probes,
+        '',
         '};')
@@ -26,65 +26,60 @@ def generate(events, backend, group):
         '#include "%s"' % header,
         '')
 
+    # Collect the declarations in a single pass and write them in one go
+    event_decls = []
+    dstate_decls = []
+    enabled_defs = []       # static state
     for e in events:
-        out('extern TraceEvent %(event)s;',
-            event = e.api(e.QEMU_EVENT))
+        event_decls.append('extern TraceEvent %s;' % e.api(e.QEMU_EVENT))
+        dstate_decls.append('extern uint16_t %s;' % e.api(e.QEMU_DSTATE))
 
-    for e in events:
-        out('extern uint16_t %s;' % e.api(e.QEMU_DSTATE))
-
-    # static state
-    for e in events:
         if 'disable' in e.properties:
             enabled = 0
         else:
             enabled = 1
         if "tcg-exec" in e.properties:
             # a single define for the two "sub-events"
-            out('#define TRACE_%(name)s_ENABLED %(enabled)d',
-                name=e.original.name.upper(),
-                enabled=enabled)
-        out('#define TRACE_%s_ENABLED %d' % (e.name.upper(), enabled))
+            enabled_defs.append('#define TRACE_%s_ENABLED %d' %
+                                (e.original.name.upper(), enabled))
+        enabled_defs.append('#define TRACE_%s_ENABLED %d' %
+                            (e.name.upper(), enabled))
+
+    if event_decls:
+        out(*(event_decls + dstate_decls + enabled_defs))
 
     backend.generate_begin(events, group)
 
     for e in events:
+        enabled = "disable" not in e.properties
+        api_nocheck = e.api(e.QEMU_TRACE_NOCHECK)
+
         # tracer-specific dstate
         out('',
-            '#define %(api)s() ( \\',
-            api=e.api(e.QEMU_BACKEND_DSTATE))
+            '#define %s() ( \\' % e.api(e.QEMU_BACKEND_DSTATE))
 
-        if "disable" not in e.properties:
+        if enabled:
             backend.generate_backend_dstate(e, group)
 
-        out('    false)')
-
         # tracer without checks
-        out('',
-            'static inline void %(api)s(%(args)s)',
-            '{',
-            api=e.api(e.QEMU_TRACE_NOCHECK),
-            args=e.args)
+        out('    false)',
+            '',
+            'static inline void %s(%s)' % (api_nocheck, e.args),
+            '{')
 
-        if "disable" not in e.properties:
+        if enabled:
             backend.generate(e, group)
 
-        out('}')
-
         cond = "true"
 
-        out('',
-            'static inline void %(api)s(%(args)s)',
+        out('}',
+            '',
+            'static inline void %s(%s)' % (e.api(), e.args),
             '{',
-            '    if (%(cond)s) {',
-            '        %(api_nocheck)s(%(names)s);',
+            '    if (%s) {' % cond,
+            '        %s(%s);' % (api_nocheck, ", ".join(e.args.names())),
             '    }',
-            '}',
-            api=e.api(),
-            api_nocheck=e.api(e.QEMU_TRACE_NOCHECK),
-            args=e.args,
-            names=", ".join(e.args.names()),
-            cond=cond)
+            '}')
 
     backend.generate_end(events, group)
 
@@ -8,6 +8,8 @@
 # This work is licensed under the terms of the GNU GPL, version 2 or
 # later.  See the COPYING file in the top-level directory.
 
+import concurrent.futures
+import functools
 import logging
 import os
 import shutil
@@ -101,6 +103,11 @@ def is_readable_executable_file(path):
     return os.path.isfile(path) and os.access(path, os.R_OK | os.X_OK)
 
 
+#: The host system arch, as given by :func:`os.uname`
+HOST_ARCH = os.uname()[4]
+
+
+@functools.lru_cache(maxsize=None)
 def pick_default_qemu_bin(bin_prefix='qemu-system-', arch=None):
     """
     Picks the path of a QEMU binary, starting either in the current working
@@ -112,11 +119,11 @@ def pick_default_qemu_bin(bin_prefix='qemu-system-', arch=None):
                  :func:`os.uname`).
     :type arch: str
     :returns: the path to the default QEMU binary or None if one could not
-              be found
+              be found.  The result is cached for each set of arguments.
     :rtype: str or None
     """
     if arch is None:
-        arch = os.uname()[4]
+        arch = HOST_ARCH
     # qemu binary path does not match arch for powerpc, handle it
     if 'ppc64le' in arch:
         arch = 'ppc64'
@@ -247,9 +254,9 @@ def setUp(self, bin_prefix):
         self.cpu = self.params.get('cpu',
                                    default=self._get_unique_tag_val('cpu'))
 
-        default_qemu_bin = pick_default_qemu_bin(bin_prefix, arch=self.arch)
-        self.qemu_bin = self.params.get('qemu_bin',
-                                        default=default_qemu_bin)
+        self.qemu_bin = self.params.get('qemu_bin')
+        if self.qemu_bin is None:
+            self.qemu_bin = pick_default_qemu_bin(bin_prefix, arch=self.arch)
         if self.qemu_bin is None:
             self.cancel("No QEMU binary defined or found in the build tree")
 
@@ -265,6 +272,19 @@ def fetch_asset(self, name,
                         find_only=find_only,
                         cancel_on_missing=cancel_on_missing)
 
+    def fetch_assets(self, *assets):
+        """
+        Fetches several assets concurrently.
+
+        :param assets: one dict of :meth:`fetch_asset` keyword arguments
+                       per asset, including its ``name``
+        :returns: the asset paths, in the order the assets were given
+        :rtype: list
+        """
+        with concurrent.futures.ThreadPoolExecutor(len(assets)) as executor:
+            return list(executor.map(lambda kwargs: self.fetch_asset(**kwargs),
+                                     assets))
+
 
 class QemuSystemTest(QemuBaseTest):
     """Facilitates system emulation tests."""
@@ -15,25 +15,21 @@
 import sys
 import subprocess
 import json
-import hashlib
 import atexit
-import uuid
 import argparse
 import enum
-import tempfile
 import re
 import signal
 import getpass
-from tarfile import TarFile, TarInfo
-from io import StringIO, BytesIO
-from shutil import copy, rmtree
-from datetime import datetime, timedelta
+import shlex
 
+# Modules only needed by some subcommands (hashlib, tempfile, shutil,
+# tarfile, uuid, concurrent.futures) are imported where they are used,
+# so that quick commands such as "probe" or "clean" don't pay for them.
 
-FILTERED_ENV_NAMES = ['ftp_proxy', 'http_proxy', 'https_proxy']
 
+FILTERED_ENV_NAMES = ['ftp_proxy', 'http_proxy', 'https_proxy']
 
-DEVNULL = open(os.devnull, 'wb')
 
 class EngineEnum(enum.IntEnum):
     AUTO = 1
@@ -56,8 +52,12 @@ def argparse(s):
 
 USE_ENGINE = EngineEnum.AUTO
 
+# Engine command found by _guess_engine_command(), see there
+_ENGINE_COMMAND = None
+
 def _bytes_checksum(bytes):
     """Calculate a digest string unique to the text content"""
+    import hashlib
     return hashlib.sha1(bytes).hexdigest()
 
 def _text_checksum(text):
@@ -72,7 +72,19 @@ def _file_checksum(filename):
 
 
 def _guess_engine_command():
-    """ Guess a working engine command or raise exception if not found"""
+    """ Guess a working engine command or raise exception if not found
+
+    With --engine auto, the command can be forced with the QEMU_DOCKER_CMD
+    environment variable (e.g. "sudo -n docker"), which skips probing
+    entirely.  An explicit --engine always wins.  Otherwise the result of
+    the probe is remembered for the lifetime of the process."""
+    global _ENGINE_COMMAND
+
+    if USE_ENGINE == EngineEnum.AUTO and "QEMU_DOCKER_CMD" in os.environ:
+        return shlex.split(os.environ["QEMU_DOCKER_CMD"])
+    if _ENGINE_COMMAND is not None:
+        return _ENGINE_COMMAND
+
     commands = []
 
     if USE_ENGINE in [EngineEnum.AUTO, EngineEnum.PODMAN]:
@@ -84,7 +96,9 @@ def _guess_engine_command():
             # docker version will return the client details in stdout
             # but still report a status of 1 if it can't contact the daemon
             if subprocess.call(cmd + ["version"],
-                               stdout=DEVNULL, stderr=DEVNULL) == 0:
+                               stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL) == 0:
+                _ENGINE_COMMAND = cmd
                 return cmd
         except OSError:
             pass
@@ -95,12 +109,10 @@ def _guess_engine_command():
 
 def _copy_with_mkdir(src, root_dir, sub_path='.', name=None):
     """Copy src into root_dir, creating sub_path as needed."""
+    from shutil import copy
+
     dest_dir = os.path.normpath("%s/%s" % (root_dir, sub_path))
-    try:
-        os.makedirs(dest_dir)
-    except OSError:
-        # we can safely ignore already created directories
-        pass
+    os.makedirs(dest_dir, exist_ok=True)
 
     dest_file = "%s/%s" % (dest_dir, name if name else os.path.basename(src))
 
@@ -111,6 +123,12 @@ def _copy_with_mkdir(src, root_dir, sub_path='.', name=None):
         pass
 
 
+# Matches the library path in lines of ldd output such as
+#   libc.so.6 => /lib64/libc.so.6 (0x00007f2c6e600000)
+#   /lib64/ld-linux-x86-64.so.2 (0x00007f2c6e94b000)
+LDD_RE = re.compile(r"(?:\S+ => )?(\S*) \(:?0x[0-9a-f]+\)")
+
+
 def _get_so_libs(executable):
     """Return a list of libraries associated with an executable.
 
@@ -118,16 +136,13 @@ def _get_so_libs(executable):
     ensure the right data is copied."""
 
     libs = []
-    ldd_re = re.compile(r"(?:\S+ => )?(\S*) \(:?0x[0-9a-f]+\)")
     try:
-        ldd_output = subprocess.check_output(["ldd", executable]).decode('utf-8')
-        for line in ldd_output.split("\n"):
-            search = ldd_re.search(line)
+        ldd_output = subprocess.check_output(["ldd", executable],
+                                             encoding='utf-8')
+        for line in ldd_output.splitlines():
+            search = LDD_RE.search(line)
             if search:
-                try:
-                    libs.append(search.group(1))
-                except IndexError:
-                    pass
+                libs.append(search.group(1))
     except subprocess.CalledProcessError:
         print("%s had no associated libraries (static build?)" % (executable))
 
@@ -151,13 +166,18 @@ def _copy_binary_with_libs(src, bin_dest, dest_dir):
     else:
         print("only copying support libraries for %s" % (src))
 
-    libs = _get_so_libs(src)
+    def copy_lib(l):
+        so_path = os.path.dirname(l)
+        name = os.path.basename(l)
+        real_l = os.path.realpath(l)
+        _copy_with_mkdir(real_l, dest_dir, so_path, name)
+
+    # The copies are independent of each other, overlap their I/O
+    libs = dict.fromkeys(_get_so_libs(src))
     if libs:
-        for l in libs:
-            so_path = os.path.dirname(l)
-            name = os.path.basename(l)
-            real_l = os.path.realpath(l)
-            _copy_with_mkdir(real_l, dest_dir, so_path, name)
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(copy_lib, libs))
 
 
 def _check_binfmt_misc(executable):
@@ -176,7 +196,7 @@ def _check_binfmt_misc(executable):
     binfmt_entry = "/proc/sys/fs/binfmt_misc/%s" % (binary)
 
     if not os.path.exists(binfmt_entry):
-        print ("No binfmt_misc entry for %s" % (binary))
+        print("No binfmt_misc entry for %s" % (binary))
         return None, False
 
     with open(binfmt_entry) as x: entry = x.read()
@@ -238,13 +258,14 @@ def __init__(self):
 
     def _do(self, cmd, quiet=True, **kwargs):
         if quiet:
-            kwargs["stdout"] = DEVNULL
+            kwargs["stdout"] = subprocess.DEVNULL
         return subprocess.call(self._command + cmd, **kwargs)
 
     def _do_check(self, cmd, quiet=True, **kwargs):
         if quiet:
-            kwargs["stdout"] = DEVNULL
-        return subprocess.check_call(self._command + cmd, **kwargs)
+            kwargs["stdout"] = subprocess.DEVNULL
+        return subprocess.run(self._command + cmd, check=True,
+                              **kwargs).returncode
 
     def _do_kill_instances(self, only_known, only_active=True):
         cmd = ["ps", "-q"]
@@ -261,8 +282,9 @@ def _do_kill_instances(self, only_known, only_active=True):
 
         print("filter=%s" % (filter))
         cmd.append(filter)
-        for i in self._output(cmd).split():
-            self._do(["rm", "-f", i])
+        instances = self._output(cmd).split()
+        if instances:
+            self._do(["rm", "-f"] + instances)
 
     def clean(self):
         self._do_kill_instances(False, False)
@@ -272,16 +294,10 @@ def _kill_instances(self, *args, **kwargs):
         return self._do_kill_instances(True)
 
     def _output(self, cmd, **kwargs):
-        try:
-            return subprocess.check_output(self._command + cmd,
-                                           stderr=subprocess.STDOUT,
-                                           encoding='utf-8',
-                                           **kwargs)
-        except TypeError:
-            # 'encoding' argument was added in 3.6+
-            return subprocess.check_output(self._command + cmd,
-                                           stderr=subprocess.STDOUT,
-                                           **kwargs).decode('utf-8')
+        return subprocess.check_output(self._command + cmd,
+                                       stderr=subprocess.STDOUT,
+                                       encoding='utf-8',
+                                       **kwargs)
 
 
     def inspect_tag(self, tag):
@@ -294,41 +310,39 @@ def get_image_creation_time(self, info):
         return json.loads(info)[0]["Created"]
 
     def get_image_dockerfile_checksum(self, tag):
-        resp = self.inspect_tag(tag)
-        labels = json.loads(resp)[0]["Config"].get("Labels", {})
-        return labels.get("com.qemu.dockerfile-checksum", "")
+        # Have the engine pick the label instead of dumping the whole
+        # image description as JSON
+        label = '{{index .Config.Labels "com.qemu.dockerfile-checksum"}}'
+        return self._output(["inspect", "--format", label, tag]).strip()
 
     def build_image(self, tag, docker_dir, dockerfile,
                     quiet=True, user=False, argv=None, registry=None,
-                    extra_files_cksum=[]):
+                    extra_files_cksum=[], checksum=None):
         if argv is None:
             argv = []
 
         if not _dockerfile_verify_flat(dockerfile):
             return -1
 
-        checksum = _text_checksum(dockerfile)
+        if checksum is None:
+            checksum = _text_checksum(dockerfile)
 
-        tmp_df = tempfile.NamedTemporaryFile(mode="w+t",
-                                             encoding='utf-8',
-                                             dir=docker_dir, suffix=".docker")
-        tmp_df.write(dockerfile)
+        # The final Dockerfile is passed on stdin, see "-f -" below
+        df = [dockerfile]
 
         if user:
             uid = os.getuid()
             uname = getpass.getuser()
-            tmp_df.write("\n")
-            tmp_df.write("RUN id %s 2>/dev/null || useradd -u %d -U %s" %
-                         (uname, uid, uname))
+            df.append("\n")
+            df.append("RUN id %s 2>/dev/null || useradd -u %d -U %s" %
+                      (uname, uid, uname))
 
-        tmp_df.write("\n")
-        tmp_df.write("LABEL com.qemu.dockerfile-checksum=%s\n" % (checksum))
+        df.append("\n")
+        df.append("LABEL com.qemu.dockerfile-checksum=%s\n" % (checksum))
         for f, c in extra_files_cksum:
-            tmp_df.write("LABEL com.qemu.%s-checksum=%s\n" % (f, c))
+            df.append("LABEL com.qemu.%s-checksum=%s\n" % (f, c))
 
-        tmp_df.flush()
-
-        build_args = ["build", "-t", tag, "-f", tmp_df.name]
+        build_args = ["build", "-t", tag, "-f", "-"]
         if self._buildkit:
             build_args += ["--build-arg", "BUILDKIT_INLINE_CACHE=1"]
 
@@ -341,21 +355,24 @@ def build_image(self, tag, docker_dir, dockerfile,
         build_args += [docker_dir]
 
         self._do_check(build_args,
-                       quiet=quiet)
+                       quiet=quiet, input="".join(df).encode('utf-8'))
 
     def update_image(self, tag, tarball, quiet=True):
         "Update a tagged image using "
 
         self._do_check(["build", "-t", tag, "-"], quiet=quiet, stdin=tarball)
 
-    def image_matches_dockerfile(self, tag, dockerfile):
+    def image_matches_dockerfile(self, tag, dockerfile, checksum=None):
         try:
-            checksum = self.get_image_dockerfile_checksum(tag)
+            image_checksum = self.get_image_dockerfile_checksum(tag)
         except Exception:
             return False
-        return checksum == _text_checksum(dockerfile)
+        if checksum is None:
+            checksum = _text_checksum(dockerfile)
+        return image_checksum == checksum
 
     def run(self, cmd, keep, quiet, as_user=False):
+        import uuid
         label = uuid.uuid4().hex
         if not keep:
             self._instance = label
@@ -441,14 +458,18 @@ def args(self, parser):
 
     def run(self, args, argv):
         dockerfile = _read_dockerfile(args.dockerfile)
+        checksum = _text_checksum(dockerfile)
         tag = args.tag
 
         dkr = Docker()
         if "--no-cache" not in argv and \
-           dkr.image_matches_dockerfile(tag, dockerfile):
+           dkr.image_matches_dockerfile(tag, dockerfile, checksum):
             if not args.quiet:
                 print("Image is up to date.")
         else:
+            import tempfile
+            from shutil import rmtree
+
             # Create a docker context directory for the build
             docker_dir = tempfile.mkdtemp(prefix="docker_build")
 
@@ -463,7 +484,7 @@ def run(self, args, argv):
             # Is there a .pre file to run in the build context?
             docker_pre = os.path.splitext(args.dockerfile)[0]+".pre"
             if os.path.exists(docker_pre):
-                stdout = DEVNULL if args.quiet else None
+                stdout = subprocess.DEVNULL if args.quiet else None
                 rc = subprocess.call(os.path.realpath(docker_pre),
                                      cwd=docker_dir, stdout=stdout)
                 if rc == 3:
@@ -493,7 +514,7 @@ def run(self, args, argv):
             dkr.build_image(tag, docker_dir, dockerfile,
                             quiet=args.quiet, user=args.user,
                             argv=argv, registry=args.registry,
-                            extra_files_cksum=cksum)
+                            extra_files_cksum=cksum, checksum=checksum)
 
             rmtree(docker_dir)
 
@@ -531,6 +552,10 @@ def args(self, parser):
                             help="Add the current user to image's passwd")
 
     def run(self, args, argv):
+        import tempfile
+        from io import StringIO, BytesIO
+        from tarfile import TarFile, TarInfo
+
         # Create a temporary tarball with our whole build context and
         # dockerfile for the update
         tmp = tempfile.NamedTemporaryFile(suffix="dckr.tar.gz")
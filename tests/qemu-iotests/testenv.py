@@ -17,6 +17,7 @@
 #
 
 import os
+import stat
 import sys
 import tempfile
 from pathlib import Path
@@ -25,31 +26,61 @@
 import random
 import subprocess
 import glob
-from typing import List, Dict, Any, Optional, ContextManager
+from typing import List, Dict, Any, Optional, ContextManager, Tuple
 
 DEF_GDB_OPTIONS = 'localhost:12345'
 
+# Machine to run tests with, by qemu-system-* suffix, for the targets that
+# need one other than their default
+MACHINE_MAP = {
+    'arm': 'virt',
+    'aarch64': 'virt',
+    'avr': 'mega2560',
+    'm68k': 'virt',
+    'riscv32': 'virt',
+    'riscv64': 'virt',
+    'rx': 'gdbsim-r5f562n8',
+    'tricore': 'tricore_testboard',
+}
+
+
+EXEC_BITS = stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+
+
 def isxfile(path: str) -> bool:
     return os.path.isfile(path) and os.access(path, os.X_OK)
 
 
+# Default machine of a QEMU binary, keyed by path and modification time
+_default_machine_cache: Dict[Tuple[str, int], str] = {}
+
+
 def get_default_machine(qemu_prog: str) -> str:
+    key = (qemu_prog, os.stat(qemu_prog).st_mtime_ns)
+    if key in _default_machine_cache:
+        return _default_machine_cache[key]
+
     outp = subprocess.run([qemu_prog, '-machine', 'help'], check=True,
                           universal_newlines=True,
                           stdout=subprocess.PIPE).stdout
 
-    machines = outp.split('\n')
-    try:
-        default_machine = next(m for m in machines if m.endswith(' (default)'))
-    except StopIteration:
-        return ''
-    default_machine = default_machine.split(' ', 1)[0]
-
-    alias_suf = ' (alias of {})'.format(default_machine)
-    alias = next((m for m in machines if m.endswith(alias_suf)), None)
-    if alias is not None:
-        default_machine = alias.split(' ', 1)[0]
-
+    # Find the default machine and the aliases of all machines in one pass
+    default_machine: Optional[str] = None
+    aliases: Dict[str, str] = {}
+    alias_of = ' (alias of '
+    for m in outp.split('\n'):
+        if default_machine is None and m.endswith(' (default)'):
+            default_machine = m.split(' ', 1)[0]
+        elif m.endswith(')') and alias_of in m:
+            target = m.rsplit(alias_of, 1)[1][:-1]
+            aliases.setdefault(target, m.split(' ', 1)[0])
+
+    if default_machine is None:
+        default_machine = ''
+    else:
+        default_machine = aliases.get(default_machine, default_machine)
+
+    _default_machine_cache[key] = default_machine
     return default_machine
 
 
@@ -165,9 +196,12 @@ def root(*names: str) -> str:
 
         for b in [self.qemu_img_prog, self.qemu_io_prog, self.qemu_nbd_prog,
                   self.qemu_prog, self.qsd_prog]:
-            if not os.path.exists(b):
+            # One stat() per binary rather than exists() + isfile() + access()
+            try:
+                st = os.stat(b)
+            except OSError:
                 sys.exit('No such file: ' + b)
-            if not isxfile(b):
+            if not stat.S_ISREG(st.st_mode) or not st.st_mode & EXEC_BITS:
                 sys.exit('Not executable: ' + b)
 
     def __init__(self, source_dir: str, build_dir: str,
@@ -230,19 +264,10 @@ def __init__(self, source_dir: str, build_dir: str,
 
         # QEMU_OPTIONS
         self.qemu_options = '-nodefaults -display none -accel qtest'
-        machine_map = (
-            ('arm', 'virt'),
-            ('aarch64', 'virt'),
-            ('avr', 'mega2560'),
-            ('m68k', 'virt'),
-            ('riscv32', 'virt'),
-            ('riscv64', 'virt'),
-            ('rx', 'gdbsim-r5f562n8'),
-            ('tricore', 'tricore_testboard')
-        )
-        for suffix, machine in machine_map:
-            if self.qemu_prog.endswith(f'qemu-system-{suffix}'):
-                self.qemu_options += f' -machine {machine}'
+        _, sep, suffix = self.qemu_prog.rpartition('qemu-system-')
+        machine = MACHINE_MAP.get(suffix) if sep else None
+        if machine:
+            self.qemu_options += f' -machine {machine}'
 
         # QEMU_DEFAULT_MACHINE
         self.qemu_default_machine = get_default_machine(self.qemu_prog)